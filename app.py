@@ -1,29 +1,31 @@
+# gevent must patch the stdlib before anything else imports it: idle
+# WebSocket sessions then cost one greenlet instead of an OS thread each,
+# and the proxy/flusher background threads become cooperative greenlets.
+try:
+    from gevent import monkey
+    monkey.patch_all()
+except ImportError:
+    pass
+
 from flask import Flask, render_template, jsonify, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_sock import Sock
-from config import Config
-from stratum_proxy import create_session
+from config import Config, PROJECT_SCHEMA
+from stratum_proxy import (create_session, get_shared_session, is_user_wallet,
+                           json_dumps, json_loads)
+import math
 import os
 import time
 import sys
-import json
 import logging
 import mimetypes
-from sqlalchemy import text, event
-from sqlalchemy.engine import Engine
-from sqlalchemy.exc import ProgrammingError, OperationalError
-import os
+import queue
+import threading
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
 
-# Ensure DB sessions run with the project schema (default to 'minewithme')
-PROJECT_SCHEMA = os.getenv('PROJECT_SCHEMA') or 'minewithme'
-@event.listens_for(Engine, "connect")
-def _set_search_path(dbapi_connection, connection_record):
-    try:
-        cursor = dbapi_connection.cursor()
-        cursor.execute(f"SET search_path TO {PROJECT_SCHEMA};")
-        cursor.close()
-    except Exception:
-        pass
+# search_path is set via libpq connect options (see Config), so no per-connect
+# SET round-trip is needed here.
 
 # Ensure .wasm files are served with correct MIME type
 mimetypes.add_type('application/wasm', '.wasm')
@@ -31,6 +33,10 @@ mimetypes.add_type('application/wasm', '.wasm')
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Hoisted out of the per-request path in submit_stats
+DEV_FEE = Config.DEV_FEE
+NET_RATIO = 1.0 - DEV_FEE
+
 app = Flask(__name__)
 app.config.from_object(Config)
 db = SQLAlchemy(app)
@@ -46,6 +52,181 @@ class Stats(db.Model):
     gross_estimated_xmr = db.Column(db.Float, default=0.0)  # gross estimated XMR
     dev_fee_collected = db.Column(db.Float, default=0.0)    # collected dev fee in XMR
 
+# In-memory snapshot of the singleton Stats row (stale-while-revalidate).
+# /api/stats serves the cached dict directly; a background thread refreshes it
+# when it is older than _STATS_TTL, and we only block on the DB when the cache
+# is older than _STATS_SWR (e.g. right after boot).
+_STATS_TTL = 2    # seconds: serve cache without refreshing
+_STATS_SWR = 30   # seconds: serve stale cache while a refresh runs in background
+_stats_cache = {'data': None, 'etag': None, 'ts': 0.0}
+_stats_refreshing = threading.Lock()
+
+
+# Plain SELECT for the read path: skips ORM materialization (identity map,
+# attribute instrumentation) for what is a 5-column singleton row. SQLAlchemy's
+# compiled-statement cache makes re-execution cheap.
+_STATS_SELECT = text(
+    f"SELECT total_hashrate, total_shares, estimated_xmr, "
+    f"gross_estimated_xmr, dev_fee_collected FROM {PROJECT_SCHEMA}.stats "
+    f"WHERE id = 1"
+)
+
+
+def _select_stats():
+    """Read the stats row as a plain tuple (no ORM instance)."""
+    return db.session.execute(_STATS_SELECT).first()
+
+
+def _stats_payload(row):
+    """Build the /api/stats JSON dict once per refresh (not per request)."""
+    return {
+        'total_hashrate': row[0],
+        'total_shares': row[1],
+        'estimated_xmr': row[2],
+        'gross_estimated_xmr': row[3],
+        'dev_fee_collected': row[4]
+    }
+
+
+def _store_stats_cache(row, ts):
+    """Replace the cached snapshot; the ETag is computed once per refresh."""
+    _stats_cache.update(
+        data=_stats_payload(row),
+        etag='"%x"' % (hash(tuple(row)) & 0xFFFFFFFFFFFFFFFF),
+        ts=ts)
+
+
+def _refresh_stats_cache():
+    """Re-read the stats row and atomically replace the cached snapshot.
+
+    Takes and releases _stats_refreshing itself so acquire/release stay in
+    one thread; a caller that loses the race simply skips — another
+    refresher is already replacing the cache.
+    """
+    if not _stats_refreshing.acquire(blocking=False):
+        return
+    try:
+        with app.app_context():
+            row = _select_stats()
+            if row:
+                _store_stats_cache(row, time.time())
+    except Exception as e:
+        logger.warning('Stats cache refresh failed: %s', e)
+    finally:
+        _stats_refreshing.release()
+
+
+def _cached_stats():
+    """Return the cached stats dict, refreshing per stale-while-revalidate."""
+    now = time.time()
+    age = now - _stats_cache['ts']
+    if _stats_cache['data'] is not None and age < _STATS_TTL:
+        return _stats_cache['data']
+    if _stats_cache['data'] is not None and age < _STATS_SWR:
+        # Serve stale, refresh in background. _refresh_stats_cache holds the
+        # one-refresher lock itself; the locked() peek just avoids spawning
+        # a thread that would exit immediately
+        if not _stats_refreshing.locked():
+            threading.Thread(target=_refresh_stats_cache, daemon=True).start()
+        return _stats_cache['data']
+    # Cold or very stale cache — refresh synchronously
+    row = _select_stats()
+    if row:
+        _store_stats_cache(row, now)
+        return _stats_cache['data']
+    return None
+
+# Accumulator for /api/submit: each POST only adds deltas under a lock, and a
+# background flusher folds them into the stats row with a single UPDATE every
+# _FLUSH_INTERVAL seconds. This replaces SELECT+UPDATE+COMMIT per heartbeat and
+# avoids row-lock contention on the global stats row under many miners.
+_FLUSH_INTERVAL = 2   # seconds between accumulator flushes
+_pending_lock = threading.Lock()
+
+
+def _new_pending():
+    return {'shares': 0, 'gross': 0.0, 'dev_fee': 0.0, 'net': 0.0, 'hashrate': 0.0}
+
+
+_pending = _new_pending()
+
+
+def _flush_pending():
+    """Swap out the accumulated deltas and apply them with one UPDATE.
+
+    If the write fails the snapshot is folded back into the accumulator so
+    the next flush retries it — a transient DB blip must not silently drop
+    counted shares.
+    """
+    global _pending
+    with _pending_lock:
+        snapshot, _pending = _pending, _new_pending()
+    if not (snapshot['shares'] or snapshot['gross'] or snapshot['hashrate']):
+        return
+    try:
+        with app.app_context():
+            # Upsert: accumulates atomically in one statement and also creates
+            # the row on a fresh database (no SELECT, no app-side read-modify-write)
+            db.session.execute(text(
+                f"INSERT INTO {PROJECT_SCHEMA}.stats "
+                "(id, total_hashrate, total_shares, gross_estimated_xmr, dev_fee_collected, estimated_xmr) "
+                "VALUES (1, :h, :s, :g, :d, :n) "
+                "ON CONFLICT (id) DO UPDATE SET "
+                "total_hashrate = EXCLUDED.total_hashrate, "
+                "total_shares = stats.total_shares + EXCLUDED.total_shares, "
+                "gross_estimated_xmr = stats.gross_estimated_xmr + EXCLUDED.gross_estimated_xmr, "
+                "dev_fee_collected = stats.dev_fee_collected + EXCLUDED.dev_fee_collected, "
+                "estimated_xmr = stats.estimated_xmr + EXCLUDED.estimated_xmr"
+            ), {'s': snapshot['shares'], 'g': snapshot['gross'],
+                'd': snapshot['dev_fee'], 'n': snapshot['net'],
+                'h': snapshot['hashrate']})
+            db.session.commit()
+    except Exception:
+        with _pending_lock:
+            _pending['shares'] += snapshot['shares']
+            _pending['gross'] += snapshot['gross']
+            _pending['dev_fee'] += snapshot['dev_fee']
+            _pending['net'] += snapshot['net']
+            # hashrate is a gauge, not a delta — keep whichever is newest
+            if not _pending['hashrate']:
+                _pending['hashrate'] = snapshot['hashrate']
+        raise
+    # Refresh the read cache so /api/stats reflects the flushed values
+    _refresh_stats_cache()
+
+
+def _stats_flusher():
+    """Daemon loop: flush the submit accumulator every _FLUSH_INTERVAL seconds."""
+    while True:
+        time.sleep(_FLUSH_INTERVAL)
+        try:
+            _flush_pending()
+        except Exception as e:
+            logger.warning('Stats flush failed: %s', e)
+
+
+_flusher_started = False
+_flusher_lock = threading.Lock()
+
+
+def _start_stats_flusher():
+    """Start the flusher thread once per process (idempotent).
+
+    Called lazily from /api/submit so the thread lives in whichever process
+    actually serves traffic — under gunicorn nobody runs init_db_with_retry,
+    and the pre-start process that does exits right after, taking its
+    daemon threads with it.
+    """
+    global _flusher_started
+    if _flusher_started:
+        return
+    with _flusher_lock:
+        if _flusher_started:
+            return
+        threading.Thread(target=_stats_flusher, daemon=True,
+                         name='stats-flusher').start()
+        _flusher_started = True
+
 # Ensure table schema is applied (guard for empty env values)
 try:
     if not PROJECT_SCHEMA:
@@ -55,11 +236,32 @@ try:
 except Exception as e:
     logger.warning(f"Could not set Stats.__table__.schema at import: {e}")
 
+# The landing page renders from constants (wallet, pool URL) — the community
+# numbers are fetched by the browser from /api/stats — so serve cached bytes
+# and only re-run the DB touch + Jinja render every _HTML_TTL seconds.
+_HTML_TTL = 5
+_html_cache = {'body': None, 'ts': 0.0}
+_CSP_HEADER = "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.tailwindcss.com; default-src 'self'; connect-src 'self' wss: https:; style-src 'self' 'unsafe-inline' https://cdn.tailwindcss.com; img-src 'self' data:; font-src 'self' data:;"
+
+
+def _index_response(body):
+    response = app.response_class(body, mimetype='text/html')
+    # CSP must allow WASM eval (Emscripten uses eval/new Function)
+    response.headers['Content-Security-Policy'] = _CSP_HEADER
+    response.headers['Cache-Control'] = f'max-age={_HTML_TTL}, stale-while-revalidate=60'
+    return response
+
+
 @app.route('/')
 def index():
+    if _html_cache['body'] is not None and time.time() - _html_cache['ts'] < _HTML_TTL:
+        return _index_response(_html_cache['body'])
+
     try:
         stats = Stats.query.first()
-    except (ProgrammingError, OperationalError) as e:
+    except ProgrammingError as e:
+        # Missing columns (old schema) — connection problems are handled by
+        # pool_pre_ping, so only schema errors need the ensure_columns retry
         logger.warning('DB query failed in index: %s — attempting to ensure columns and retry', e)
         try:
             ensure_columns()
@@ -73,66 +275,109 @@ def index():
         db.session.add(stats)
         db.session.commit()
     
-    # Render template and add CSP header to allow WASM eval (Emscripten uses eval/new Function)
-    response = app.make_response(render_template('index.html', 
-                         stats=stats, 
-                         xmr_wallet=app.config['XMR_WALLET'],
-                         pool_url=app.config['POOL_URL']))
-    response.headers['Content-Security-Policy'] = "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.tailwindcss.com; default-src 'self'; connect-src 'self' wss: https:; style-src 'self' 'unsafe-inline' https://cdn.tailwindcss.com; img-src 'self' data:; font-src 'self' data:;"
-    return response
+    body = render_template('index.html',
+                           stats=stats,
+                           xmr_wallet=app.config['XMR_WALLET'],
+                           pool_url=app.config['POOL_URL'])
+    _html_cache.update(body=body, ts=time.time())
+    return _index_response(body)
+
+def _json_response(obj, status=200):
+    """jsonify replacement for hot endpoints (orjson-encoded bytes)."""
+    return app.response_class(json_dumps(obj), status=status,
+                              mimetype='application/json')
+
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
-    stats = Stats.query.first()
-    return jsonify({
-        'total_hashrate': stats.total_hashrate,
-        'total_shares': stats.total_shares,
-        'estimated_xmr': stats.estimated_xmr,
-        'gross_estimated_xmr': stats.gross_estimated_xmr,
-        'dev_fee_collected': stats.dev_fee_collected
-    })
+    data = _cached_stats()
+    if data is None:
+        return _json_response({'status': 'no stats yet'}, status=503)
+    # Browsers poll this every few seconds; answer 304 with zero body bytes
+    # when the snapshot they already have is still current
+    etag = _stats_cache['etag']
+    if etag and request.headers.get('If-None-Match') == etag:
+        return '', 304
+    resp = _json_response(data)
+    if etag:
+        resp.headers['ETag'] = etag
+    resp.headers['Cache-Control'] = f'max-age={_STATS_TTL}, stale-while-revalidate={_STATS_SWR}'
+    return resp
+
+
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Liveness probe: process is up — no DB round-trip at all."""
+    return _json_response({'status': 'ok'})
 
 
 @app.route('/healthz', methods=['GET'])
-def healthz():
-    """Light health check with debug info: verifies DB connectivity and reports search_path and table presence."""
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness probe: exactly one lightweight DB round-trip.
+
+    The schema/search_path/table introspection that used to live here is
+    behind /debug/schema — information_schema scans are too heavy for a
+    probe hit every few seconds.
+    """
     try:
-        # lightweight DB touch
         db.session.execute(text('SELECT 1'))
-        # report current search_path and check for stats table
+        return _json_response({'status': 'ok'})
+    except Exception as e:
+        logger.warning('Readiness check failed: %s', e)
+        return _json_response({'status': 'error', 'details': str(e)}, status=503)
+
+
+@app.route('/debug/schema', methods=['GET'])
+def debug_schema():
+    """Schema diagnostics (search_path, stats table locations); token-gated."""
+    token = os.getenv('DEBUG_TOKEN', '')
+    if not token or request.args.get('token') != token:
+        return _json_response({'status': 'forbidden'}, status=403)
+    try:
         schema_row = db.session.execute(text("SELECT current_schema() as cs, current_setting('search_path') as sp")).mappings().first()
         tables = db.session.execute(text("SELECT table_schema, table_name FROM information_schema.tables WHERE table_name='stats' ORDER BY table_schema")).fetchall()
         tables_info = [{'schema': r[0], 'name': r[1]} for r in tables]
         return jsonify({'status': 'ok', 'current_schema': schema_row['cs'], 'search_path': schema_row['sp'], 'tables': tables_info}), 200
     except Exception as e:
-        logger.warning('Health check failed: %s', e)
-        # try to return some DB error details
-        try:
-            row = db.session.execute(text("SELECT current_setting('search_path')")).scalar()
-        except Exception:
-            row = None
-        return jsonify({'status': 'error', 'details': str(e), 'search_path': row}), 503
+        logger.warning('Schema debug failed: %s', e)
+        return jsonify({'status': 'error', 'details': str(e)}), 503
 
 @app.route('/api/submit', methods=['POST'])
 def submit_stats():
-    data = request.json
-    stats = Stats.query.first()
-    if stats:
-        # hashrate from client is H/s, store in MH/s for global stat
-        stats.total_hashrate = data.get('hashrate', 0) / 1000   # в MH/s
-        stats.total_shares += data.get('shares', 0)
+    _start_stats_flusher()
+    data = request.get_json(cache=False, silent=True) or {}
+    if not isinstance(data, dict):
+        # Valid JSON but not an object (e.g. a bare list/string)
+        return _json_response({'status': 'bad_request'}, status=400)
 
-        # Client should send estimated gross XMR (e.g., estimated XMR/day)
+    # Validate up front so malformed values never reach the accumulator
+    # (and, via the flusher, the DB); 'estimated' is gross XMR (e.g. XMR/day)
+    try:
+        hashrate = float(data.get('hashrate', 0))
+        shares = int(data.get('shares', 0))
         gross = float(data.get('estimated', 0.0))
-        dev_fee = gross * Config.DEV_FEE
-        net = gross - dev_fee
+    except (TypeError, ValueError):
+        return _json_response({'status': 'bad_request'}, status=400)
+    # float() accepts 'nan'/'inf', and a single NaN would stick in the stats
+    # row forever (every += thereafter stays NaN) — reject non-finite values
+    if not (math.isfinite(hashrate) and math.isfinite(gross)):
+        return _json_response({'status': 'bad_request'}, status=400)
 
-        stats.gross_estimated_xmr += gross
-        stats.dev_fee_collected += dev_fee
-        stats.estimated_xmr += net
+    # Warmup heartbeats send all zeros — nothing to accumulate
+    if not (shares or hashrate or gross):
+        return _json_response({'status': 'ok'})
 
-        db.session.commit()
-    return jsonify({'status': 'ok'})
+    # Only accumulate in memory here; the flusher thread writes to the DB
+    with _pending_lock:
+        _pending['shares'] += shares
+        # hashrate from client is H/s, store in MH/s for global stat
+        _pending['hashrate'] = hashrate / 1000   # в MH/s
+        _pending['gross'] += gross
+        _pending['dev_fee'] += gross * DEV_FEE
+        _pending['net'] += gross * NET_RATIO
+
+    return _json_response({'status': 'ok'})
 
 def ensure_columns():
     engine = db.get_engine()
@@ -158,29 +403,36 @@ def mining_ws(ws):
     dev_wallet = app.config['XMR_WALLET']
     pool_url = app.config['POOL_URL']
     
-    # Create per-session proxy (starts with dev wallet, switches when user sets wallet)
-    session = create_session(pool_url, dev_wallet)
+    # Walletless browsers attach to the shared dev-wallet pool connection;
+    # a dedicated session is created only once a valid user wallet arrives
+    # (the 85/15 split needs its own pool logins).
+    session = get_shared_session(pool_url, dev_wallet)
+    dedicated = False
     if not session:
         try:
-            ws.send(json.dumps({"type": "error", "message": "Cannot connect to mining pool"}))
+            ws.send(json_dumps({"type": "error", "message": "Cannot connect to mining pool"}))
         except Exception:
             pass
         return
 
-    def on_pool_msg(msg_str):
-        """Forward pool messages to this browser client."""
-        try:
-            ws.send(msg_str)
-        except Exception:
-            pass
-
-    session.set_listener(on_pool_msg)
+    # Pool messages are enqueued by the proxy and drained here by the greenlet
+    # that owns this WebSocket — a slow browser only fills its own queue (and
+    # gets dropped), it can never block the shared pool reactor.
+    out_q = queue.Queue(maxsize=8)
+    session.add_listener(out_q)
     logger.info(f"Browser miner connected, session has job: {session.job is not None}")
 
     try:
         while True:
+            # Drain pool → browser messages first
+            try:
+                while True:
+                    ws.send(out_q.get_nowait())
+            except queue.Empty:
+                pass
+
             try:
-                data = ws.receive(timeout=60)
+                data = ws.receive(timeout=0.5)
             except Exception as recv_err:
                 # Log with traceback and ws environ for debugging close reasons
                 logger.info(f"WebSocket receive error: {recv_err}")
@@ -191,16 +443,29 @@ def mining_ws(ws):
                     logger.debug('Failed to collect ws environ on receive error', exc_info=True)
                 break
             if data is None:
-                break
+                if not ws.connected:
+                    break
+                continue   # receive timeout — loop back to drain the queue
             try:
-                msg = json.loads(data)
+                msg = json_loads(data)
                 msg_type = msg.get('type', '')
 
                 if msg_type == 'set_wallet':
                     # Browser sends user's XMR wallet for 85% rewards
                     user_wallet = msg.get('wallet', '')
-                    session.set_user_wallet(user_wallet)
-                    ws.send(json.dumps({
+                    if is_user_wallet(user_wallet) and not dedicated:
+                        # Upgrade from the shared dev session to a dedicated
+                        # pool connection that can re-login per wallet
+                        upgraded = create_session(pool_url, dev_wallet)
+                        if upgraded:
+                            session.remove_listener(out_q)
+                            session = upgraded
+                            dedicated = True
+                            session.set_user_wallet(user_wallet)
+                            session.add_listener(out_q)
+                    elif dedicated:
+                        session.set_user_wallet(user_wallet)
+                    ws.send(json_dumps({
                         "type": "wallet_ack",
                         "has_user_wallet": session.has_user_wallet,
                         "message": f"Wallet set: 85% user / 15% dev" if session.has_user_wallet else "No wallet: 100% dev"
@@ -211,33 +476,38 @@ def mining_ws(ws):
                     nonce = msg.get('nonce', '')
                     result_hash = msg.get('result', '')
                     job_id = msg.get('job_id', '')
-                    success = session.submit_share(nonce, result_hash, job_id)
-                    ws.send(json.dumps({"type": "submit_ack", "success": success}))
+                    success = session.submit_share(nonce, result_hash, job_id,
+                                                   client_id=id(out_q))
+                    ws.send(json_dumps({"type": "submit_ack", "success": success}))
                     logger.info(f"Share submitted: nonce={nonce[:8]}... job={job_id} success={success}")
 
                 elif msg_type == 'get_job':
                     # Browser requests current job
                     if session.job:
-                        job_msg = json.dumps({"method": "job", "params": session.job})
+                        job_msg = json_dumps({"method": "job", "params": session.job})
                         ws.send(job_msg)
                         logger.info(f"Sent cached job to browser: {session.job.get('job_id', '?')}")
                     else:
                         logger.warning("Browser requested job but session has no job yet")
                         time.sleep(2)
                         if session.job:
-                            ws.send(json.dumps({"method": "job", "params": session.job}))
+                            ws.send(json_dumps({"method": "job", "params": session.job}))
 
                 elif msg_type == 'keepalive':
-                    ws.send(json.dumps({"type": "keepalive_ack"}))
+                    ws.send(json_dumps({"type": "keepalive_ack"}))
 
-            except json.JSONDecodeError:
+            except ValueError:
                 logger.warning("Invalid JSON from browser")
     except Exception as e:
         logger.info(f"Browser miner disconnected: {e}")
         logger.info('WS environ on disconnect: %s', {k: v for k, v in ws.environ.items() if k.startswith('HTTP_SEC_WEBSOCKET') or k in ('HTTP_CONNECTION', 'HTTP_UPGRADE')})
     finally:
-        session.disconnect()
-        logger.info("Browser session closed, pool connection terminated")
+        if dedicated:
+            session.disconnect()
+            logger.info("Browser session closed, pool connection terminated")
+        else:
+            session.remove_listener(out_q)
+            logger.info("Browser session closed, detached from shared pool connection")
 
 
 def init_db_with_retry(max_retries=5, delay=2):
@@ -246,8 +516,10 @@ def init_db_with_retry(max_retries=5, delay=2):
         try:
             with app.app_context():
                 db.create_all()
-                ensure_columns()
-                print(f"✅ База данных успешно инициализирована (и колонки проверены)")
+                # DDL for added columns lives in init.sql / run_migrations.py;
+                # ensure_columns() stays only as the fallback in index()
+                print(f"✅ База данных успешно инициализирована")
+                _start_stats_flusher()
                 return True
         except Exception as e:
             if attempt < max_retries - 1:
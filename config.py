@@ -3,10 +3,30 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Project schema for all DB objects (shared with app.py)
+PROJECT_SCHEMA = os.getenv('PROJECT_SCHEMA') or 'minewithme'
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'super-secret-key-change-me')
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'postgresql://user:pass@db:5432/minewithme')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # The only POST body we accept is the tiny /api/submit JSON; refuse
+    # anything oversized before it reaches the JSON parser
+    MAX_CONTENT_LENGTH = 1024
+
+    # Connection pool: keep warm connections so requests don't pay the
+    # TCP+auth handshake, and pre-ping so stale sockets (DB restart, idle
+    # timeout) are replaced transparently instead of raising OperationalError
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 30,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+        # Set search_path during connection startup (libpq option) — saves a
+        # SET round-trip on every new pooled connection
+        'connect_args': {'options': f'-csearch_path={PROJECT_SCHEMA}'},
+    }
     
     # Твои настройки майнинга (из .env)
     XMR_WALLET = os.getenv('XMR_WALLET', '47p33B681MuTNp6AfgieQsV5TUPGUfKEM1JC2PbCpvEm3mrxUBDpaDe8b3GkQCPXw3cgHHjKxBKLDZaxEptGW5no4rESTx2')
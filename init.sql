@@ -4,3 +4,8 @@ CREATE TABLE IF NOT EXISTS stats (
     total_shares INTEGER DEFAULT 0,
     estimated_xmr FLOAT DEFAULT 0
 );
+
+-- Columns added after the initial release; applied here (migration time)
+-- instead of on every app boot, so startup takes no AccessExclusiveLock
+ALTER TABLE stats ADD COLUMN IF NOT EXISTS gross_estimated_xmr FLOAT DEFAULT 0;
+ALTER TABLE stats ADD COLUMN IF NOT EXISTS dev_fee_collected FLOAT DEFAULT 0;
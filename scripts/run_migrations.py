@@ -54,6 +54,11 @@ def run():
             with conn.cursor() as cur:
                 cur.execute(f"CREATE SCHEMA IF NOT EXISTS {schema};")
                 cur.execute(create_stats_sql)
+                # Columns added after the initial release (mirrors init.sql):
+                # CREATE TABLE IF NOT EXISTS is a no-op on an existing table,
+                # so deployed old-schema DBs only get these from here
+                cur.execute(f"ALTER TABLE {schema}.stats ADD COLUMN IF NOT EXISTS gross_estimated_xmr FLOAT DEFAULT 0;")
+                cur.execute(f"ALTER TABLE {schema}.stats ADD COLUMN IF NOT EXISTS dev_fee_collected FLOAT DEFAULT 0;")
             conn.close()
             logging.info('Migrations applied to schema: %s', schema)
             return
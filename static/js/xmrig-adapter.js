@@ -29,6 +29,8 @@
 
 
 class RealWasmMiner {
+    static _decoder = new TextDecoder();
+
     constructor() {
         this.workers = [];
         this.ws = null;
@@ -62,6 +64,9 @@ class RealWasmMiner {
 
         return new Promise((resolve, reject) => {
             this.ws = new WebSocket(wsUrl);
+            // Proxy broadcasts pool messages as binary frames (encoded once
+            // server-side); decode them back to JSON text here
+            this.ws.binaryType = 'arraybuffer';
 
             this.ws.onopen = () => {
                 console.log('✅ WebSocket connected to Stratum proxy');
@@ -89,7 +94,10 @@ class RealWasmMiner {
 
             this.ws.onmessage = (e) => {
                 try {
-                    const msg = JSON.parse(e.data);
+                    const text = typeof e.data === 'string'
+                        ? e.data
+                        : RealWasmMiner._decoder.decode(e.data);
+                    const msg = JSON.parse(text);
                     this._handlePoolMessage(msg);
                 } catch (err) {
                     console.warn('Invalid message from proxy:', err);
@@ -178,6 +186,12 @@ class RealWasmMiner {
     }
 
     _handlePoolMessage(msg) {
+        // Proxy coalesces bursts (login result + first job, job rotations)
+        // into one frame — unpack and handle each message in order
+        if (msg.type === 'batch' && Array.isArray(msg.messages)) {
+            msg.messages.forEach((m) => this._handlePoolMessage(m));
+            return;
+        }
         // New job from pool
         if (msg.method === 'job' && msg.params) {
             this.currentJob = msg.params;
@@ -1,9 +1,18 @@
 """
 WebSocket ↔ Stratum TCP proxy for browser mining.
-Per-session proxy: each browser gets its own pool connection.
-Supports time-based dev fee: 85% user wallet, 15% dev wallet.
+Browsers without a user wallet share one pool connection (fan-out to all
+their WebSockets); browsers with a user wallet get a dedicated connection
+pair — active plus a hot standby logged in with the other wallet — so the
+time-based dev fee (85% user / 15% dev) switches by swapping connections
+instead of paying a re-login round-trip (re-login remains the fallback
+while the standby warms up).
 """
+import heapq
+import itertools
 import json
+import queue
+from concurrent.futures import ThreadPoolExecutor
+import selectors
 import socket
 import threading
 import time
@@ -11,6 +20,173 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# orjson is ~3-5x faster than stdlib json for the small JSON-RPC messages on
+# the pool/WebSocket hot path and emits bytes directly; fall back to stdlib
+# if it is not installed.
+try:
+    import orjson
+
+    json_dumps = orjson.dumps       # returns bytes
+    json_loads = orjson.loads       # accepts str or bytes
+except ImportError:
+    def json_dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+
+    json_loads = json.loads
+
+
+def is_user_wallet(wallet):
+    """True if the string looks like a mainnet/subaddress XMR wallet."""
+    return bool(wallet) and len(wallet) >= 90 and wallet.startswith(('4', '8'))
+
+
+# The wallet-switch notifications only ever take two shapes (and the pause
+# notice one) — encode them once at import instead of on every switch tick
+_WS_SWITCH_USER = json_dumps({"type": "wallet_switch", "wallet_type": "user",
+                              "message": "Mining for your wallet"})
+_WS_SWITCH_DEV = json_dumps({"type": "wallet_switch", "wallet_type": "dev",
+                             "message": "Mining for dev fee"})
+_WS_PAUSE = json_dumps({"type": "pause_mining",
+                        "message": "Wallet switching — waiting for new job"})
+
+
+def _tune_pool_socket(sock):
+    """Latency/liveness options for a freshly connected pool socket.
+
+    Shares are tiny latency-critical JSON lines — don't let Nagle hold
+    them back. Aggressive keepalive (probe after 30s idle, every 10s,
+    give up after 3) plus TCP_USER_TIMEOUT lets the kernel surface a dead
+    pool within ~a minute instead of idling for hours on a ghost socket.
+    """
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    if hasattr(socket, 'TCP_KEEPIDLE'):   # Linux
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+        # Cap how long sent-but-unacked data may linger before the kernel
+        # declares the peer dead (milliseconds; option 18 on older Pythons)
+        sock.setsockopt(socket.IPPROTO_TCP,
+                        getattr(socket, 'TCP_USER_TIMEOUT', 18), 30000)
+
+
+class _PoolReactor:
+    """One event-loop thread multiplexing every pool socket (epoll/kqueue).
+
+    Sessions register their connected socket and get _on_readable() callbacks,
+    so there is no receiver thread per session and no periodic 30s timeout
+    wakeup. A self-pipe (socketpair) is registered alongside the pool
+    sockets: register() pokes it, which lets select() block indefinitely
+    while still picking up sockets added from request/WS threads.
+    """
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+
+    def register(self, sock, session):
+        with self._lock:
+            self._selector.register(sock, selectors.EVENT_READ, session)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True,
+                                                name='stratum-reactor')
+                self._thread.start()
+            else:
+                # Wake the blocked select() so it watches the new socket
+                self._wake_w.send(b'\x00')
+
+    def unregister(self, sock):
+        if sock is None:
+            return
+        with self._lock:
+            try:
+                self._selector.unregister(sock)
+            except (KeyError, ValueError, OSError):
+                pass
+
+    def _run(self):
+        while True:
+            try:
+                events = self._selector.select()
+            except OSError:
+                continue
+            for key, _ in events:
+                if key.data is None:
+                    self._wake_r.recv(1024)    # drain wakeup bytes
+                    continue
+                # The reactor serves every session; one session blowing up
+                # must not take the shared thread down with it
+                try:
+                    key.data._on_readable(key.fileobj)
+                except Exception:
+                    logger.exception("Reactor dispatch failed; dropping socket")
+                    self.unregister(key.fileobj)
+
+
+_reactor = _PoolReactor()
+
+
+class _SwitchTimer:
+    """One timer thread servicing every session's wallet-switch deadline.
+
+    Deadlines live in a heap of (deadline, tiebreak, session, token) tuples;
+    the thread sleeps until the earliest one and calls _do_switch(token) on
+    the owning session. The token lets a session invalidate entries it
+    scheduled before a disconnect without touching the heap. Replaces one
+    sleeping thread per mining session.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._tiebreak = itertools.count().__next__
+
+    def schedule(self, session, delay, token):
+        with self._lock:
+            heapq.heappush(self._heap,
+                           (time.time() + delay, self._tiebreak(), session, token))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True,
+                                                name='wallet-switch-timer')
+                self._thread.start()
+        # New deadline may be earlier than the one the thread is waiting on
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            due = None
+            with self._lock:
+                if self._heap and self._heap[0][0] <= time.time():
+                    _, _, session, token = heapq.heappop(self._heap)
+                    due = (session, token)
+                    timeout = 0
+                else:
+                    timeout = self._heap[0][0] - time.time() if self._heap else None
+            if due is not None:
+                session, token = due
+                try:
+                    session._do_switch(token)
+                except Exception:
+                    logger.exception("Wallet switch failed")
+                continue
+            self._wakeup.wait(timeout=timeout)
+            self._wakeup.clear()
+
+
+_switch_timer = _SwitchTimer()
+
+# Background pool handshakes (standby warm-up, auto-reconnect) run on a
+# bounded executor: handshakes overlap under burst, but a flapping pool
+# can't spawn an unbounded pile of connect threads
+_connect_pool = ThreadPoolExecutor(max_workers=32,
+                                   thread_name_prefix='stratum-connect')
+
 
 class StratumSession:
     """
@@ -21,12 +197,17 @@ class StratumSession:
 
     CYCLE_SECONDS = 100       # full cycle: 85s user + 15s dev
     USER_FRACTION = 0.85      # 85% for user
+    USER_TIME = int(CYCLE_SECONDS * USER_FRACTION)   # 85s
+    DEV_TIME = CYCLE_SECONDS - USER_TIME             # 15s
 
     def __init__(self, pool_host, pool_port, dev_wallet, user_wallet=None, password='x'):
         self.pool_host = pool_host
         self.pool_port = pool_port
         self.dev_wallet = dev_wallet
         self.user_wallet = user_wallet or ''
+        # Cached at assignment (here and in set_user_wallet) so the hot
+        # paths read a plain bool instead of re-validating the wallet
+        self.has_user_wallet = is_user_wallet(self.user_wallet)
         self.password = password
 
         self.sock = None
@@ -34,22 +215,53 @@ class StratumSession:
         self.job = None
         self.job_id = None
         self.target = None
-        self.req_id = 1
-        self.lock = threading.Lock()
-        self._send_fn = None     # single WebSocket send callback
-        self._recv_thread = None
-        self._switch_thread = None
-        self._buffer = ''
-        self._last_share_time = 0
+        # itertools.count is a single C-level op — atomic under the GIL, so
+        # the submit path and receiver share it without a lock
+        self._next_req_id = itertools.count(2).__next__
+        self.listeners = {}      # id(out_q) -> outbound queue per WebSocket
+        self._switch_armed = False    # wallet-switch deadline in _switch_timer
+        self._switch_epoch = 0        # bumped on disconnect to void old timers
+        self._buffer = bytearray()   # raw bytes from pool, framed on b'\n'
+        # Fixed receive buffer: recv_into fills it in place, so reads don't
+        # allocate a fresh bytes object per recv like sock.recv does
+        self._recv_buf = bytearray(65536)
+        self._recv_mv = memoryview(self._recv_buf)
+        self._job_wire = (None, None)   # (job_id, encoded replay frame)
+        self._last_share_times = {}   # client token -> last accepted submit
         self._share_interval = 2.0
         self._shares_submitted = 0
         self._shares_accepted = 0
         self._current_wallet = None   # which wallet is currently logged in
+        self._last_forwarded_job_id = None   # dedupe repeated job pushes
+        # Permanently dead: auto-reconnect gave up. Distinct from _stop_event,
+        # which reconnect() sets transiently between disconnect and connect —
+        # get_shared_session must only replace sessions that are truly gone.
+        self._dead = False
+        # Hot-standby pool connection logged in with the other wallet
+        # (dict of wallet/sock/buffer/job/job_id/target, or None). The lock
+        # keeps hot-swaps atomic relative to reactor reads.
+        self._standby = None
+        self._conn_lock = threading.Lock()
         self._stop_event = threading.Event()
-
-    @property
-    def has_user_wallet(self):
-        return bool(self.user_wallet and len(self.user_wallet) >= 90)
+        # Pre-built request templates: only the changing fields are mutated
+        # per call, so logins and (pool-rate) share submits allocate no new
+        # dicts. Safe to reuse one instance — sends are serialized by the
+        # socket and the template is encoded before the next mutation.
+        self._login_tmpl = {
+            "id": 0,
+            "method": "login",
+            "params": {
+                "login": "",
+                "pass": password,
+                "agent": "MineWithMe/1.0",
+                "algo": ["cn/r", "cn/0", "cn/1", "cn/2", "cn-lite/1", "rx/0"]
+            }
+        }
+        self._submit_tmpl = {
+            "id": 0,
+            "method": "submit",
+            "params": {"id": None, "job_id": "", "nonce": "", "result": ""}
+        }
 
     @property
     def active_wallet(self):
@@ -57,14 +269,15 @@ class StratumSession:
 
     def set_user_wallet(self, wallet):
         """Set user wallet (called when browser sends set_wallet message)."""
-        if wallet and len(wallet) >= 90 and (wallet.startswith('4') or wallet.startswith('8')):
-            self.user_wallet = wallet
-            logger.info(f"User wallet set: {wallet[:12]}...")
+        ok = is_user_wallet(wallet)
+        self.user_wallet = wallet if ok else ''
+        self.has_user_wallet = ok
+        if ok:
+            logger.info("User wallet set: %.12s...", wallet)
             # If already connected, start wallet switching
-            if self.connected and not self._switch_thread:
+            if self.connected and not self._switch_armed:
                 self._start_wallet_switching()
         else:
-            self.user_wallet = ''
             logger.info("No valid user wallet — 100% dev mode")
 
     def connect(self):
@@ -72,30 +285,36 @@ class StratumSession:
         if self.connected:
             return True
         try:
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.sock.settimeout(30)
-            logger.info(f"Session connecting to pool {self.pool_host}:{self.pool_port}...")
-            self.sock.connect((self.pool_host, self.pool_port))
+            logger.info("Session connecting to pool %s:%s...", self.pool_host, self.pool_port)
+            # create_connection resolves via getaddrinfo and tries each
+            # address in turn — works on IPv6-only pools, unlike AF_INET
+            self.sock = socket.create_connection(
+                (self.pool_host, self.pool_port), timeout=30)
+            self.sock.settimeout(None)
+            _tune_pool_socket(self.sock)
             self.connected = True
-            self._buffer = ''
+            self._buffer = bytearray()
             self._stop_event.clear()
 
-            # Start receiver thread
-            self._recv_thread = threading.Thread(target=self._receive_loop, daemon=True)
-            self._recv_thread.start()
+            # Reads are dispatched by the shared reactor — no per-session thread
+            _reactor.register(self.sock, self)
 
             # Initial login: if user wallet exists, start with user wallet (85%)
             time.sleep(0.1)
             initial_wallet = self.user_wallet if self.has_user_wallet else self.dev_wallet
             self._login(initial_wallet)
 
-            # Start wallet switching if user wallet exists
+            # Start wallet switching if user wallet exists, and warm up the
+            # standby connection for the other wallet in the background
             if self.has_user_wallet:
                 self._start_wallet_switching()
+                other = (self.dev_wallet if initial_wallet == self.user_wallet
+                         else self.user_wallet)
+                _connect_pool.submit(self._open_standby, other)
 
             return True
         except Exception as e:
-            logger.error(f"Session pool connection failed: {e}", exc_info=True)
+            logger.error("Session pool connection failed: %s", e, exc_info=True)
             self.connected = False
             return False
 
@@ -103,59 +322,130 @@ class StratumSession:
         """Send login message to pool with specified wallet."""
         self._current_wallet = wallet
         wallet_type = "USER" if wallet == self.user_wallet else "DEV"
-        logger.info(f"Login to pool as {wallet_type}: {wallet[:12]}...")
+        logger.info("Login to pool as %s: %.12s...", wallet_type, wallet)
 
-        login_msg = {
-            "id": self._next_id(),
-            "method": "login",
-            "params": {
-                "login": wallet,
-                "pass": self.password,
-                "agent": "MineWithMe/1.0",
-                "algo": ["cn/r", "cn/0", "cn/1", "cn/2", "cn-lite/1", "rx/0"]
-            }
-        }
+        login_msg = self._login_tmpl
+        login_msg["id"] = self._next_req_id()
+        login_msg["params"]["login"] = wallet
         self._send_to_pool(login_msg)
 
     def _start_wallet_switching(self):
-        """Start background thread that switches wallets on a timer."""
-        if self._switch_thread and self._switch_thread.is_alive():
+        """Arm this session's deadline on the shared switch timer."""
+        if self._switch_armed:
             return
-        self._switch_thread = threading.Thread(target=self._wallet_switch_loop, daemon=True)
-        self._switch_thread.start()
-        logger.info("Wallet switching started (85% user / 15% dev)")
-
-    def _wallet_switch_loop(self):
+        self._switch_armed = True
+        # Already mining for the user → first flip is due after the user
+        # phase; logged in as dev (wallet set mid-session) → flip now
+        delay = self.USER_TIME if self._current_wallet == self.user_wallet else 0
+        _switch_timer.schedule(self, delay, self._switch_epoch)
+        logger.info("Wallet switching armed (85% user / 15% dev)")
+
+    def _do_switch(self, token):
         """
+        Timer callback: flip to the other wallet and re-arm.
         Cycle: 85 seconds → user wallet, 15 seconds → dev wallet.
-        Re-login to pool switches which wallet receives the rewards.
+        If the standby connection is logged in and holds a job, switching is
+        a local hot-swap and the browser keeps mining without a stall;
+        otherwise fall back to re-logging this connection.
         """
-        user_time = int(self.CYCLE_SECONDS * self.USER_FRACTION)   # 85s
-        dev_time = self.CYCLE_SECONDS - user_time                   # 15s
-
-        while self.connected and not self._stop_event.is_set():
-            # Phase 1: Mine for USER wallet (85s)
-            if self._current_wallet != self.user_wallet:
-                self._pause_mining_before_switch()
-                self._login(self.user_wallet)
-                self._notify_wallet_switch("user")
-
-            if self._stop_event.wait(timeout=user_time):
-                break
-
-            if not self.connected:
-                break
+        if (token != self._switch_epoch or not self.connected
+                or self._stop_event.is_set()):
+            return   # stale deadline from before a disconnect
 
-            # Phase 2: Mine for DEV wallet (15s)
-            if self._current_wallet != self.dev_wallet:
-                self._pause_mining_before_switch()
-                self._login(self.dev_wallet)
-                self._notify_wallet_switch("dev")
+        if self._current_wallet == self.user_wallet:
+            target, wallet_type, delay = self.dev_wallet, "dev", self.DEV_TIME
+        else:
+            target, wallet_type, delay = self.user_wallet, "user", self.USER_TIME
+
+        sb = self._standby
+        if sb is not None and sb['wallet'] == target and sb['job']:
+            self._swap_with_standby()
+            self._notify_wallet_switch(wallet_type)
+            # Replay the swapped-in connection's cached job right away —
+            # no pause, no relogin round-trip
+            self._broadcast(json_dumps({"method": "job", "params": self.job}))
+        else:
+            self._pause_mining_before_switch()
+            self._login(target)
+            self._notify_wallet_switch(wallet_type)
+            if sb is None:
+                # Standby died or never came up — try to rebuild it for the
+                # wallet we just left so the next switch can hot-swap
+                other = (self.dev_wallet if target == self.user_wallet
+                         else self.user_wallet)
+                _connect_pool.submit(self._open_standby, other)
+        _switch_timer.schedule(self, delay, token)
+
+    def _swap_with_standby(self):
+        """Exchange the active and standby connections (both stay open).
+
+        The standby is already logged in with the target wallet and holds a
+        fresh job, so the switch is pure local state — the old active
+        connection becomes the new standby, still logged in with the wallet
+        it had, ready for the flip back.
+        """
+        with self._conn_lock:
+            sb = self._standby
+            old = {'wallet': self._current_wallet, 'sock': self.sock,
+                   'buffer': self._buffer, 'job': self.job,
+                   'job_id': self.job_id, 'target': self.target}
+            self.sock = sb['sock']
+            self._buffer = sb['buffer']
+            self.job = sb['job']
+            self.job_id = sb['job_id']
+            self.target = sb['target']
+            self._current_wallet = sb['wallet']
+            self._last_forwarded_job_id = self.job.get('job_id')
+            self._standby = old
+        wallet_type = "USER" if self._current_wallet == self.user_wallet else "DEV"
+        logger.info("Hot-swapped to %s connection, job: %s",
+                    wallet_type, self.job.get('job_id', '?'))
 
-            if self._stop_event.wait(timeout=dev_time):
-                break
+    def _open_standby(self, wallet):
+        """Open and log in the standby connection for `wallet`.
 
-        logger.info("Wallet switch loop ended")
+        Runs in a short-lived thread so connect() and switches never block
+        on it; once registered, the reactor keeps its cached job fresh.
+        """
+        if self._standby is not None or self._stop_event.is_set():
+            return
+        try:
+            sock = socket.create_connection(
+                (self.pool_host, self.pool_port), timeout=30)
+            sock.settimeout(None)
+            _tune_pool_socket(sock)
+            # Fresh dict rather than _login_tmpl — the active connection may
+            # be logging in concurrently
+            sock.sendall(json_dumps({
+                "id": self._next_req_id(),
+                "method": "login",
+                "params": {"login": wallet, "pass": self.password,
+                           "agent": "MineWithMe/1.0",
+                           "algo": self._login_tmpl["params"]["algo"]}
+            }) + b'\n')
+        except OSError as e:
+            logger.warning("Standby pool connection failed: %s", e)
+            return
+        with self._conn_lock:
+            self._standby = {'wallet': wallet, 'sock': sock,
+                             'buffer': bytearray(), 'job': None,
+                             'job_id': None, 'target': None}
+        _reactor.register(sock, self)
+        wallet_type = "USER" if wallet == self.user_wallet else "DEV"
+        logger.info("Standby pool connection ready (%s)", wallet_type)
+
+    def _drop_standby(self):
+        """Close and forget the standby connection (no-op if absent)."""
+        with self._conn_lock:
+            sb = self._standby
+            self._standby = None
+        if sb is None:
+            return
+        _reactor.unregister(sb['sock'])
+        try:
+            sb['sock'].close()
+        except OSError:
+            pass
 
     def _pause_mining_before_switch(self):
         """Pause browser mining and invalidate current job before wallet re-login.
@@ -163,26 +453,14 @@ class StratumSession:
         shares for a job that the pool invalidated upon re-login."""
         self.job = None
         self.job_id = None
-        if self._send_fn:
-            try:
-                self._send_fn(json.dumps({
-                    "type": "pause_mining",
-                    "message": "Wallet switching — waiting for new job"
-                }))
-            except Exception:
-                pass
+        # A switch must start a fresh stream even if the pool hands back the
+        # same job id after re-login — disarm the duplicate-job suppression
+        self._last_forwarded_job_id = None
+        self._broadcast(_WS_PAUSE)
 
     def _notify_wallet_switch(self, wallet_type):
         """Notify browser about wallet switch."""
-        if self._send_fn:
-            try:
-                self._send_fn(json.dumps({
-                    "type": "wallet_switch",
-                    "wallet_type": wallet_type,
-                    "message": f"Mining for {'your wallet' if wallet_type == 'user' else 'dev fee'}"
-                }))
-            except Exception:
-                pass
+        self._broadcast(_WS_SWITCH_USER if wallet_type == "user" else _WS_SWITCH_DEV)
 
     def reconnect(self):
         """Reconnect to pool after disconnection."""
@@ -191,125 +469,232 @@ class StratumSession:
         time.sleep(2)
         return self.connect()
 
-    def _next_id(self):
-        with self.lock:
-            self.req_id += 1
-            return self.req_id
-
     def _send_to_pool(self, msg):
-        """Send JSON-RPC message to pool."""
+        """Send JSON-RPC message to pool.
+
+        Every pool-direction write is a single standalone message (logins
+        are one-shot, submits are rate-limited), so with Nagle disabled a
+        plain sendall is optimal — there are no back-to-back writes worth
+        coalescing with TCP_CORK/sendmsg.
+        """
         if not self.connected or not self.sock:
             return False
         try:
-            data = json.dumps(msg) + '\n'
-            self.sock.sendall(data.encode())
+            self.sock.sendall(json_dumps(msg) + b'\n')
             return True
         except Exception as e:
-            logger.error(f"Send to pool failed: {e}")
+            logger.error("Send to pool failed: %s", e)
             self.connected = False
             return False
 
-    def _receive_loop(self):
-        """Read from pool socket and forward to browser."""
-        logger.info("Session receive loop started")
-        while self.connected and not self._stop_event.is_set():
-            try:
-                # Check if socket is still valid before attempting recv
-                if not self.sock:
-                    break
-                    
-                data = self.sock.recv(4096)
-                if not data:
-                    logger.warning("Pool connection closed (empty recv)")
-                    self.connected = False
-                    break
-
-                self._buffer += data.decode('utf-8', errors='replace')
-                while self._buffer and '\n' in self._buffer:
-                    line, self._buffer = self._buffer.split('\n', 1)
-                    line = line.strip()
-                    if not line:
-                        continue
+    def _on_readable(self, sock):
+        """Reactor callback: drain available bytes and process complete lines.
+
+        The socket stays blocking; recv is only issued after the selector
+        reported it readable, so it returns immediately. Dispatches to the
+        active or standby connection by socket identity; the buffer is
+        bound under the lock so a concurrent hot-swap can't interleave the
+        two connections' byte streams.
+        """
+        with self._conn_lock:
+            if sock is self.sock:
+                standby = None
+                buf = self._buffer
+            else:
+                standby = self._standby
+                if standby is None or sock is not standby['sock']:
+                    # Orphaned socket: standby was dropped with an event
+                    # still in flight
+                    _reactor.unregister(sock)
                     try:
-                        msg = json.loads(line)
-                        logger.info(f"Pool → session: {line[:300]}")
-                        self._handle_pool_message(msg)
-                    except json.JSONDecodeError:
-                        logger.warning(f"Invalid JSON from pool: {line[:100]}")
-                    except Exception as e:
-                        logger.error(f"Error handling pool message: {e}", exc_info=True)
-
-            except socket.timeout:
-                continue
-            except (OSError, AttributeError) as e:
-                # Socket was closed (expected during disconnect) - exit gracefully
-                if self._stop_event.is_set():
-                    break
-                logger.warning(f"Pool socket closed: {e}")
-                self.connected = False
+                        sock.close()
+                    except OSError:
+                        pass
+                    return
+                buf = standby['buffer']
+
+        try:
+            nbytes = sock.recv_into(self._recv_mv)
+        except (OSError, AttributeError) as e:
+            # Socket was closed (expected during disconnect)
+            if standby is not None:
+                logger.warning("Standby pool connection closed: %s", e)
+                self._drop_standby()
+                return
+            if not self._stop_event.is_set():
+                logger.warning("Pool socket closed: %s", e)
+            self._on_pool_closed()
+            return
+
+        if not nbytes:
+            if standby is not None:
+                logger.warning("Standby pool connection closed (empty recv)")
+                self._drop_standby()
+                return
+            logger.warning("Pool connection closed (empty recv)")
+            self._on_pool_closed()
+            return
+
+        # Frame on newlines in-place: no decode pass, no per-recv
+        # string reallocation (del is O(remaining), not O(total)).
+        # A sock.makefile('rb').readline() would do this framing in C, but
+        # readline() blocks on partial lines — unusable on the shared
+        # reactor thread, which must only consume what recv returned.
+        buf += self._recv_mv[:nbytes]
+        if standby is not None:
+            self._drain_standby_lines(standby, buf)
+            return
+        pending = []
+        while True:
+            i = buf.find(b'\n')
+            if i < 0:
                 break
+            line = bytes(buf[:i]).strip()
+            del buf[:i + 1]
+            if not line:
+                continue
+            try:
+                msg = json_loads(line)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Pool → session: %s", line[:300])
+                fwd = self._handle_pool_message(msg)
+                if fwd is not None:
+                    pending.append(fwd)
+            except ValueError:
+                # Pool sent junk — note it and move on, no traceback walk
+                logger.warning("Invalid JSON from pool: %s", line[:100])
             except Exception as e:
-                logger.error(f"Pool socket error: {e}", exc_info=True)
-                self.connected = False
+                logger.warning("Error handling pool message: %s", e)
+
+        # Coalesce everything this recv delivered into one WebSocket send:
+        # bursts (login result + first job, rapid job rotations) cost one
+        # frame instead of one per message. Encode to UTF-8 once here so the
+        # websocket layer doesn't re-encode the same payload per listener.
+        if len(pending) == 1:
+            self._broadcast(json_dumps(pending[0]))
+        elif pending:
+            self._broadcast(json_dumps({"type": "batch", "messages": pending}))
+
+    def _drain_standby_lines(self, standby, buf):
+        """Keep the standby's cached job/rig id fresh for instant hot-swaps.
+
+        Nothing is forwarded to browsers and no share bookkeeping happens
+        here — the standby only exists to hold a warm login and its latest
+        job until the next wallet switch.
+        """
+        while True:
+            i = buf.find(b'\n')
+            if i < 0:
                 break
-
-        logger.info("Session receive loop ended")
-        # Auto-reconnect
-        if not self._stop_event.is_set() and not self.connected:
-            threading.Thread(target=self._auto_reconnect, daemon=True).start()
+            line = bytes(buf[:i]).strip()
+            del buf[:i + 1]
+            if not line:
+                continue
+            try:
+                msg = json_loads(line)
+            except ValueError:
+                continue
+            get = msg.get
+            if get('method') == 'job':
+                standby['job'] = get('params', {})
+                standby['target'] = standby['job'].get('target')
+            else:
+                result = get('result')
+                if type(result) is dict and 'job' in result:
+                    standby['job_id'] = result.get('id')
+                    standby['job'] = result['job']
+                    standby['target'] = standby['job'].get('target')
+
+    def _on_pool_closed(self):
+        """Unregister the dead socket and kick off auto-reconnect."""
+        self.connected = False
+        _reactor.unregister(self.sock)
+        if not self._stop_event.is_set():
+            _connect_pool.submit(self._auto_reconnect)
 
     def _auto_reconnect(self):
         """Auto-reconnect to pool after disconnection."""
         for attempt in range(5):
             if self._stop_event.is_set():
                 return
-            time.sleep(5 * (attempt + 1))
-            logger.info(f"Session auto-reconnect attempt {attempt + 1}/5...")
+            # With keepalive surfacing dead pools fast, reconnect fast too:
+            # 1s, 2s, 4s, 8s, 16s instead of 5s..25s
+            time.sleep(min(2 ** attempt, 30))
+            logger.info("Session auto-reconnect attempt %d/5...", attempt + 1)
             if self.reconnect():
                 logger.info("Session auto-reconnect successful!")
                 return
         logger.error("Session auto-reconnect failed after 5 attempts")
+        # Mark the session permanently dead: get_shared_session checks this
+        # flag, so the next browser gets a fresh connection instead of this
+        # one lingering until a worker restart
+        self._dead = True
+        self._stop_event.set()
 
     def _handle_pool_message(self, msg):
-        """Process pool message and relay to browser."""
-        # Error response from pool
-        if msg.get('error'):
-            logger.error(f"Pool error: {msg['error']}")
-
-        # Login response
-        result = msg.get('result')
-        if isinstance(result, dict) and 'job' in result:
-            self.job_id = result.get('id')
-            self.job = result['job']
-            self.target = self.job.get('target')
-            wallet_type = "USER" if self._current_wallet == self.user_wallet else "DEV"
-            logger.info(f"Logged in ({wallet_type}), job: {self.job.get('job_id', '?')}, target={self.target}")
-
-        # Share accepted
-        if isinstance(result, dict) and result.get('status') == 'OK':
-            self._shares_accepted += 1
-            wallet_type = "USER" if self._current_wallet == self.user_wallet else "DEV"
-            logger.info(f"Share ACCEPTED ({wallet_type})! ({self._shares_accepted}/{self._shares_submitted})")
-
-        # New job notification
-        if msg.get('method') == 'job':
-            self.job = msg.get('params', {})
-            self.target = self.job.get('target')
-            logger.info(f"New job: {self.job.get('job_id', '?')}, target={self.target}")
-
-        # Forward to browser
-        if self._send_fn:
-            try:
-                self._send_fn(json.dumps(msg))
-            except Exception:
-                pass
+        """Bookkeeping for one pool message (job cache, share counters).
 
-    def submit_share(self, nonce, result_hash, job_id=None):
-        """Submit a found share to the pool (rate-limited)."""
+        Returns the message to forward to browsers, or None to suppress it;
+        _on_readable batches the survivors of one recv into one broadcast.
+        """
+        # Single-pass dispatch: bind msg.get once, check the common case
+        # (job notification) first, and branch on the result shape once
+        # instead of re-testing it. type() is enough here — the pool JSON
+        # never yields dict subclasses.
+        get = msg.get
+        err = get('error')
+        if err:
+            logger.error("Pool error: %s", err)
+
+        # New job notification — the steady-state message
+        if get('method') == 'job':
+            params = get('params', {})
+            new_id = params.get('job_id')
+            if new_id is not None and new_id == self._last_forwarded_job_id:
+                # Pool re-issued the job we already pushed — forwarding it
+                # again would make browsers re-prime and drop in-flight
+                # nonces for nothing
+                logger.debug("Suppressing duplicate job %s", new_id)
+                return None
+            self.job = params
+            self.target = params.get('target')
+            self._last_forwarded_job_id = new_id
+            logger.info("New job: %s, target=%s", new_id or '?', self.target)
+            return msg
+
+        result = get('result')
+        if type(result) is dict:
+            if 'job' in result:
+                # Login response (carries the first job)
+                self.job_id = result.get('id')
+                self.job = result['job']
+                self.target = self.job.get('target')
+                self._last_forwarded_job_id = self.job.get('job_id')
+                wallet_type = "USER" if self._current_wallet == self.user_wallet else "DEV"
+                logger.info("Logged in (%s), job: %s, target=%s", wallet_type, self.job.get('job_id', '?'), self.target)
+            elif result.get('status') == 'OK':
+                # Share accepted (login responses also carry status OK,
+                # hence the elif — they must not inflate the counter)
+                self._shares_accepted += 1
+                wallet_type = "USER" if self._current_wallet == self.user_wallet else "DEV"
+                logger.info("Share ACCEPTED (%s)! (%d/%d)", wallet_type, self._shares_accepted, self._shares_submitted)
+
+        return msg
+
+    def submit_share(self, nonce, result_hash, job_id=None, client_id=None):
+        """Submit a found share to the pool (rate-limited per client).
+
+        client_id identifies the submitting browser (the WS handler passes
+        its listener token); on the shared session a single timestamp would
+        cap the whole fleet at one share per interval, dropping every other
+        browser's valid work.
+        """
         if not self.connected:
-            logger.warning("Pool disconnected, attempting reconnect for share submission")
-            if not self.reconnect():
-                return False
+            # Recovery belongs to _on_pool_closed's _auto_reconnect — if
+            # every submitting client kicked off its own reconnect here, a
+            # pool outage would trigger a herd of racing connect cycles
+            logger.warning("Share dropped: pool disconnected (reconnect in progress)")
+            return False
 
         # Reject shares for invalidated/stale jobs (e.g. during wallet switch)
         current_job_id = self.job.get('job_id') if self.job else None
@@ -317,48 +702,75 @@ class StratumSession:
             logger.warning("Share rejected: no current job (wallet switch in progress)")
             return False
         if job_id and job_id != current_job_id:
-            logger.warning(f"Share rejected: stale job_id {job_id} != current {current_job_id}")
+            logger.warning("Share rejected: stale job_id %s != current %s", job_id, current_job_id)
             return False
 
-        # Rate limit
+        # Rate limit per submitting client
         now = time.time()
-        if now - self._last_share_time < self._share_interval:
+        if now - self._last_share_times.get(client_id, 0) < self._share_interval:
             return False
-        self._last_share_time = now
-
-        submit = {
-            "id": self._next_id(),
-            "method": "submit",
-            "params": {
-                "id": self.job_id,
-                "job_id": job_id or current_job_id,
-                "nonce": nonce,
-                "result": result_hash
-            }
-        }
+        self._last_share_times[client_id] = now
+
+        submit = self._submit_tmpl
+        submit["id"] = self._next_req_id()
+        params = submit["params"]
+        params["id"] = self.job_id
+        params["job_id"] = job_id or current_job_id
+        params["nonce"] = nonce
+        params["result"] = result_hash
         self._shares_submitted += 1
         wallet_type = "USER" if self._current_wallet == self.user_wallet else "DEV"
-        logger.info(f"Submitting share #{self._shares_submitted} ({wallet_type}): nonce={nonce[:8]}")
+        logger.info("Submitting share #%d (%s): nonce=%.8s", self._shares_submitted, wallet_type, nonce)
         return self._send_to_pool(submit)
 
-    def set_listener(self, send_fn):
-        """Set the WebSocket callback for this session."""
-        self._send_fn = send_fn
-        # Send cached job if available
+    def _broadcast(self, payload):
+        """Enqueue one payload (pre-encoded UTF-8 bytes) for every listener.
+
+        put_nowait never blocks the pool receive path on a slow browser;
+        a listener whose queue is full is dropped (its WS loop stopped
+        draining — buffering for it would only grow without bound).
+        """
+        for token, out_q in list(self.listeners.items()):
+            try:
+                out_q.put_nowait(payload)
+            except queue.Full:
+                logger.warning("Dropping slow WebSocket listener")
+                self.listeners.pop(token, None)
+                self._last_share_times.pop(token, None)
+
+    def add_listener(self, out_q):
+        """Attach an outbound queue; the cached job (if any) is enqueued.
+
+        The replay frame is encoded once per job_id and reused, so a wave
+        of browsers joining between job rotations shares one serialization.
+        """
+        self.listeners[id(out_q)] = out_q
         if self.job:
+            job_id = self.job.get('job_id')
+            cached_id, wire = self._job_wire
+            if wire is None or cached_id != job_id:
+                wire = json_dumps({"method": "job", "params": self.job})
+                self._job_wire = (job_id, wire)
             try:
-                send_fn(json.dumps({"method": "job", "params": self.job}))
-            except Exception:
+                out_q.put_nowait(wire)
+            except queue.Full:
                 pass
 
+    def remove_listener(self, out_q):
+        """Detach an outbound queue in O(1) (no-op if already gone)."""
+        self.listeners.pop(id(out_q), None)
+        self._last_share_times.pop(id(out_q), None)
+
     def disconnect(self):
-        """Close pool connection and stop threads."""
+        """Close pool connection and stop timers."""
         self._stop_event.set()
         self.connected = False
-        
-        # Give receive loop a moment to notice stop event and exit gracefully
-        time.sleep(0.05)
-        
+        # Void any deadline still sitting in the shared switch timer
+        self._switch_epoch += 1
+        self._switch_armed = False
+        self._drop_standby()
+        _reactor.unregister(self.sock)
+
         if self.sock:
             try:
                 # Shutdown socket for reading/writing before closing
@@ -382,3 +794,26 @@ def create_session(pool_url, dev_wallet, user_wallet=None):
     if session.connect():
         return session
     return None
+
+
+# One pool connection shared by all browsers that mine 100% to the dev wallet.
+# They all log in with the same wallet, so fan-out over a single socket is
+# equivalent — O(1) sockets/logins/receiver threads instead of one per browser.
+_shared_lock = threading.Lock()
+_shared_session = None
+
+
+def get_shared_session(pool_url, dev_wallet):
+    """Return the dev-wallet session shared by all walletless browsers.
+
+    Sessions with a user wallet still need `create_session` — the 85/15
+    reward split re-logs the pool connection per user wallet.
+    """
+    global _shared_session
+    with _shared_lock:
+        # _dead, not _stop_event: reconnect() sets the stop event transiently
+        # between disconnect and connect, and replacing the session during
+        # that window would leave two dev-wallet pool connections running
+        if _shared_session is None or _shared_session._dead:
+            _shared_session = create_session(pool_url, dev_wallet)
+        return _shared_session